@@ -15,6 +15,9 @@ setup(
             'upnpy-igd = upnpy.tools.igd:main',
         ],
     },
+    extras_require={
+        'fast': ['lxml'],
+    },
     keywords=['upnp', 'upnpy'],
     classifiers=[
         'Development Status :: 5 - Production/Stable',
@@ -1,39 +1,78 @@
 import urllib.parse
 import urllib.error
-from xml.dom import minidom
-from xml.etree.ElementTree import Element, SubElement, tostring
-import re
+from xml.sax.saxutils import escape, quoteattr
 
 import upnpy.utils as utils
 from upnpy import exceptions
 
 
-def _substitute_newlines_with_space(match):
-    s, e = match.span()
-    return match.string[s:e].replace('\n', ' ')
+def _find_element(root, local_name):
 
+    """
+    Find the first element with the given tag in any namespace.
+    """
+
+    for element in root.iter():
+        if utils.xml_local_name(element) == local_name:
+            return element
+    return None
 
-def _parse_response(response, action_name):
-    response = response.read().decode()
 
-    response = re.sub('(?<=>)[\\s\\t\\n]+(?=<)', '', response)
-    response = re.sub('<[^<>]+>', _substitute_newlines_with_space, response)
+def _get_element_text(root, local_name):
+    element = _find_element(root, local_name)
+    if element is None or element.text is None:
+        return ''
+    return element.text
 
+
+def _parse_response(response, action_name):
     return_arguments = {}
 
-    xml_root = minidom.parseString(response)
-    xml_response_arguments = xml_root.getElementsByTagNameNS('*', 'Body')[0] \
-        .getElementsByTagNameNS('*', action_name + 'Response')[0]
+    xml_root = utils.parse_xml_string(response.read())
+    xml_response_arguments = _find_element(_find_element(xml_root, 'Body'), action_name + 'Response')
 
-    for return_argument in xml_response_arguments.childNodes:
-        if return_argument.firstChild is None:
-            return_arguments[return_argument.tagName] = ''
-        else:
-            return_arguments[return_argument.tagName] = return_argument.firstChild.nodeValue
+    for return_argument in xml_response_arguments:
+        return_argument_name = utils.xml_local_name(return_argument)
+        if return_argument_name is not None:
+            return_arguments[return_argument_name] = return_argument.text or ''
 
     return return_arguments
 
 
+def make_envelope_template(action_name, in_argument_names):
+
+    """
+        **Build the SOAP envelope template of an action**
+
+        Builds the SOAP request body of an action once, as a ``str.format`` template. The first positional field
+        is the service type attribute and the following ones are the values of the "in" arguments, in order.
+
+        :param action_name: Name of the action
+        :type action_name: str
+        :param in_argument_names: Names of the "in" arguments of the action, in order
+        :type in_argument_names: tuple
+        :return: SOAP envelope template
+        :rtype: str
+    """
+
+    def literal(text):
+        return text.replace('{', '{{').replace('}', '}}')
+
+    template = [
+        '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/"'
+        ' s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">'
+        '<s:Body>',
+        literal(f'<u:{action_name}'), ' xmlns:u={0}>'
+    ]
+
+    for position, argument_name in enumerate(in_argument_names, 1):
+        template.append(literal(f'<{argument_name}>') + f'{{{position}}}' + literal(f'</{argument_name}>'))
+
+    template.append(literal(f'</u:{action_name}></s:Body></s:Envelope>'))
+
+    return ''.join(template)
+
+
 def send(service, action, **action_arguments):
 
     """
@@ -69,45 +108,24 @@ def send(service, action, **action_arguments):
 
     """
 
-    args_in = action.args_in
-
-    if not all(arg.name in action_arguments.keys() for arg in args_in):
+    in_argument_names = action.args_in_names
 
-        missing_arguments = []
-
-        for argument in action.args_in:
-            if argument.name not in action_arguments.keys():
-                missing_arguments.append(argument.name)
+    missing_arguments = [name for name in in_argument_names if name not in action_arguments]
 
+    if missing_arguments:
         raise exceptions.ArgumentError(
             f'Missing arguments for action "{action.name}".',
             missing_arguments
         )
 
-    for argument in action_arguments.keys():
-        in_argument_names = [arg.name for arg in args_in]
+    for argument in action_arguments:
         if argument not in in_argument_names:
             raise exceptions.ArgumentError(f'This service does not accept the "in" argument "{argument}".', argument)
 
-    xml_root = Element('s:Envelope')
-    xml_root.set('xmlns:s', 'http://schemas.xmlsoap.org/soap/envelope/')
-    xml_root.set('s:encodingStyle', 'http://schemas.xmlsoap.org/soap/encoding/')
-
-    xml_body = SubElement(xml_root, 's:Body')
-
-    xml_action_name = SubElement(xml_body, f'u:{action.name}')
-    xml_action_name.set('xmlns:u', service.service)
-
-    for argument in action.arguments:
-        try:
-            argument_value = action_arguments[argument.name]
-        except KeyError:
-            continue
-
-        xml_action_name_argument = SubElement(xml_action_name, argument.name)
-        xml_action_name_argument.text = str(argument_value)
-
-    soap_body = tostring(xml_root, short_empty_elements=False)
+    soap_body = action.envelope_template.format(
+        quoteattr(service.service),
+        *(escape(str(action_arguments[name])) for name in in_argument_names)
+    ).encode()
 
     headers = {
         'Host': f'{urllib.parse.urlparse(service.base_url).netloc}',
@@ -125,15 +143,9 @@ def send(service, action, **action_arguments):
         )
     except urllib.error.HTTPError as e:
         if e.code == 500:
-            response = e.read().decode()
-            xml_root = minidom.parseString(response)
-            error_code = xml_root.getElementsByTagName('errorCode')[0].firstChild.nodeValue
-            xml_error_description = xml_root.getElementsByTagName('errorDescription')[0].firstChild
-
-            if xml_error_description is None:
-                error_description = ''
-            else:
-                error_description = xml_error_description.nodeValue
+            xml_root = utils.parse_xml_string(e.read())
+            error_code = _get_element_text(xml_root, 'errorCode')
+            error_description = _get_element_text(xml_root, 'errorDescription')
             raise exceptions.SOAPError(error_description, int(error_code))
         else:
             raise exceptions.SOAPError('Unknown response code received.', e.code)
@@ -1,13 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
-from xml.dom import minidom
-from functools import wraps
+from functools import lru_cache, wraps
+import socket
 import urllib.error
 
 import upnpy.utils as utils
 from upnpy.soap import SOAP
+from upnpy.ssdp import SSDPParser
 from upnpy import exceptions
 
 
+# Parsed device descriptions are shared between devices and must not be modified
+_parse_device = lru_cache(maxsize=64)(SSDPParser.parse_device)
+
+
 def _device_description_required(func):
 
     """
@@ -66,6 +72,8 @@ class SSDPDevice:
         :type address: tuple
         :param response: Device discovery response data
         :type response: str
+
+        The headers of the discovery response are available in ``headers`` by lowercase header name.
     """
 
     def __init__(self, address, response):
@@ -73,18 +81,30 @@ class SSDPDevice:
         self.host = address[0]
         self.port = address[1]
         self.response = response
+        self.headers = utils.parse_http_headers(response)
+        self.config_id = self.headers.get('configid.upnp.org')
+        # USN: uuid:device-UUID[::type]
+        self.udn = self.headers.get('usn', '').split('::')[0] or None
         self.description = None
+        self._parsed_description = None
         self.friendly_name = None
         self.type_ = None
         self.base_url = None
         self.services = {}
         self.selected_service = None
 
-        self._get_description_request(utils.parse_http_header(response, 'Location'))
-        self._get_friendly_name_request()
-        self._get_type_request()
-        self._get_base_url_request()
-        self._get_services_request()
+        location = self.headers.get('location')
+
+        try:
+            self._get_description_request(location)
+            self._get_friendly_name_request()
+            self._get_type_request()
+            self._get_base_url_request()
+            self._get_services_request()
+        finally:
+            # Descriptions are only retrieved and parsed while setting up the device
+            utils.close_http_connections(location, self.base_url)
+            self._parsed_description = None
 
     def get_services(self):
 
@@ -114,9 +134,10 @@ class SSDPDevice:
 
     def _get_description_request(self, url):
         try:
-            device_description = utils.make_http_request(url).read()
+            device_description = utils.fetch_xml(url, self.config_id, self.udn)
             self.description = device_description
-            return device_description.decode()
+            self._parsed_description = _parse_device(device_description)
+            return device_description
 
         except (urllib.error.HTTPError, urllib.error.URLError):
             self.description = exceptions.NotAvailableError
@@ -124,31 +145,29 @@ class SSDPDevice:
 
     @_device_description_required
     def _get_friendly_name_request(self):
-        root = minidom.parseString(self.description)
-        device_friendly_name = root.getElementsByTagName('friendlyName')[0].firstChild.nodeValue
+        device_friendly_name = self._parsed_description['friendly_name']
         self.friendly_name = device_friendly_name
         return self.friendly_name
 
     @_device_description_required
     def _get_type_request(self):
-        root = minidom.parseString(self.description)
-        device_type = root.getElementsByTagName('deviceType')[0].firstChild.nodeValue
+        device_type = self._parsed_description['device_type']
         self.type_ = device_type
         return self.type_
 
     @_device_description_required
     def _get_base_url_request(self):
-        location_header_value = utils.parse_http_header(self.response, 'Location')
-        header_url = urlparse(location_header_value)
-        root = minidom.parseString(self.description)
-        try:
-            parsed_url = urlparse(root.getElementsByTagName('URLBase')[0].firstChild.nodeValue)
+        header_url = urlparse(self.headers.get('location'))
+        url_base = self._parsed_description['url_base']
+
+        if url_base:
+            parsed_url = urlparse(url_base)
 
             if parsed_url.port is not None:
                 base_url = f'{parsed_url.scheme}://{parsed_url.netloc}'
             else:
                 base_url = f'{parsed_url.scheme}://{parsed_url.netloc}:{header_url.port}'
-        except (IndexError, AttributeError):
+        else:
             base_url = f'{header_url.scheme}://{header_url.netloc}'
 
         self.base_url = base_url
@@ -158,31 +177,33 @@ class SSDPDevice:
     @_base_url_required
     def _get_services_request(self):
         if not self.services:
-            device_services = {}
-            root = minidom.parseString(self.description)
-
-            base_url = self.base_url
-
-            for service in root.getElementsByTagName('service'):
-                service_string = service.getElementsByTagName('serviceType')[0].firstChild.nodeValue
-                service_id = service.getElementsByTagName('serviceId')[0].firstChild.nodeValue
-                scpd_url = service.getElementsByTagName('SCPDURL')[0].firstChild.nodeValue
-                control_url = service.getElementsByTagName('controlURL')[0].firstChild.nodeValue
-                event_sub_url = service.getElementsByTagName('eventSubURL')[0].firstChild.nodeValue
-
-                parsed_service_id = utils.parse_service_id(service_id)
-
-                if parsed_service_id not in device_services.keys():
-                    device_services[parsed_service_id] = self.Service(
-                        service=service_string,
-                        service_id=service_id,
-                        scpd_url=scpd_url,
-                        control_url=control_url,
-                        event_sub_url=event_sub_url,
-                        base_url=base_url
+            device_services_arguments = {}
+
+            for service in self._parsed_description['services']:
+                parsed_service_id = utils.parse_service_id(service['service_id'])
+
+                if parsed_service_id not in device_services_arguments:
+                    device_services_arguments[parsed_service_id] = dict(
+                        service,
+                        base_url=self.base_url,
+                        config_id=self.config_id,
+                        udn=self.udn
                     )
 
-            self.services = device_services
+            # Each service retrieves its own description, fetch them concurrently
+            if len(device_services_arguments) > 1:
+                with ThreadPoolExecutor(max_workers=utils.MAX_CONCURRENT_REQUESTS) as executor:
+                    futures = {
+                        parsed_service_id: executor.submit(self.Service, **service_arguments)
+                        for parsed_service_id, service_arguments in device_services_arguments.items()
+                    }
+
+                self.services = {parsed_service_id: future.result() for parsed_service_id, future in futures.items()}
+            else:
+                self.services = {
+                    parsed_service_id: self.Service(**service_arguments)
+                    for parsed_service_id, service_arguments in device_services_arguments.items()
+                }
 
         return self.services
 
@@ -242,9 +263,17 @@ class SSDPDevice:
             :type event_sub_url: str
             :param base_url: Base URL of the service
             :type base_url: str
+            :param config_id: Configuration ID announced by the device, if any
+            :type config_id: str
+            :param udn: Unique Device Name of the device, if known
+            :type udn: str
+            :param timeout: Timeout in seconds for retrieving the service description (the global default timeout if
+                not set)
+            :type timeout: float
         """
 
-        def __init__(self, service, service_id, scpd_url, control_url, event_sub_url, base_url):
+        def __init__(self, service, service_id, scpd_url, control_url, event_sub_url, base_url, config_id=None,
+                     udn=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
 
             parsed_base_url = urlparse(base_url)
             parsed_scpd_url = urlparse(scpd_url)
@@ -272,21 +301,26 @@ class SSDPDevice:
                 raise exceptions.SchemeError(
                     'Scheme for SCPD URL was something other than "http".', parsed_scpd_url.scheme)
 
+            # urn:schemas-upnp-org:service:serviceType:v
+            service_parts = service.split(':', 5)
+
             self.service = service
-            self.type_ = self._get_service_type(service)
-            self.version = self._get_service_version(service)
+            self.type_ = service_parts[3]
+            self.version = int(service_parts[4])
             self.id = service_id
             self.scpd_url = scpd_url
             self.control_url = control_url
             self.event_sub_url = event_sub_url
             self.base_url = base_url
+            self.config_id = config_id
+            self.udn = udn
+            self.timeout = timeout
             self.actions = {}
             self.description = None
             self.state_variables = {}
 
             self._get_description_request()
-            self._get_state_variables_request()
-            self._get_actions_request()
+            self._parse_description_request()
 
         def get_actions(self):
 
@@ -309,15 +343,16 @@ class SSDPDevice:
             """
                 **Get the description of the service**
 
-                Gets the service description by sending a request to the SCPD URL of the service.
+                Gets the service description by sending a request to the SCPD URL of the service. The description
+                is read in full and kept as bytes. Descriptions already retrieved for the same SCPD URL, device and
+                device configuration are reused.
 
                 :return: Service description
-                :rtype: str
+                :rtype: bytes
             """
 
             try:
-                service_description = utils.make_http_request(self.scpd_url).read()
-                self.description = service_description.decode()
+                self.description = utils.fetch_xml(self.scpd_url, self.config_id, self.udn, self.timeout)
             except urllib.error.HTTPError as e:
                 if e.code == 404:
                     self.description = exceptions.NotAvailableError
@@ -327,135 +362,62 @@ class SSDPDevice:
             return self.description
 
         @_service_description_required
-        def _get_actions_request(self):
+        def _parse_description_request(self):
 
             """
-                **Get the service actions**
+                **Parse the service description**
 
-                Gets the actions available for the service.
+                Parses the actions and state variables of the service from the service description.
 
                 :return: List of actions available for the service
                 :rtype: list
             """
 
             all_actions = {}
-            service_description = self.description
-
-            root = minidom.parseString(service_description)
-            actions = root.getElementsByTagName('action')
-
-            for action in actions:
-                action_name = action.getElementsByTagName('name')[0].firstChild.nodeValue
-                action_arguments = []
-
-                # An action's argument list is only required if the action has parameters according to UPnP spec
-                try:
-                    action_argument_list = action.getElementsByTagName('argumentList')[0]
-                except IndexError:
-                    action_argument_list = None
-
-                if action_argument_list:
-                    action_arguments_elements = action_argument_list.getElementsByTagName('argument')
-
-                    for argument in action_arguments_elements:
-                        argument_name = argument.getElementsByTagName('name')[0].firstChild.nodeValue
-                        argument_direction = argument.getElementsByTagName('direction')[0].firstChild.nodeValue
-
-                        # Argument return value is optional according to UPnP spec
-                        try:
-                            argument_return_value = argument.getElementsByTagName('retval')[0].firstChild.nodeValue
-                        except IndexError:
-                            argument_return_value = None
-
-                        argument_related_state_variable = argument.getElementsByTagName(
-                            'relatedStateVariable'
-                        )[0].firstChild.nodeValue
-
-                        action_arguments.append(
-                            self.Action.Argument(
-                                argument_name,
-                                argument_direction,
-                                argument_return_value,
-                                argument_related_state_variable
-                            )
-                        )
-
-                all_actions[action_name] = self.Action(action_name, action_arguments, self)
-
-            self.actions = all_actions
-            return all_actions
-
-        @_service_description_required
-        def _get_state_variables_request(self):
-
-            service_description = self.description
-
-            root = minidom.parseString(service_description)
             state_variables = {}
 
-            xml_state_variables = root.getElementsByTagName('stateVariable')
-
-            for state_variable in xml_state_variables:
-                state_variable_name = state_variable.getElementsByTagName('name')[0].firstChild.nodeValue
-                state_variable_data_type = state_variable.getElementsByTagName('dataType')[0].firstChild.nodeValue
-                state_variable_allowed_value_list = []
-
-                xml_allowed_values = state_variable.getElementsByTagName('allowedValue')
+            parsed_actions, parsed_state_variables = SSDPParser.parse_scpd(self.description)
 
-                if xml_allowed_values:
-                    for allowed_value in xml_allowed_values:
-                        state_variable_allowed_value_list.append(allowed_value.firstChild.nodeValue)
+            for name, data_type, allowed_value_list in parsed_state_variables:
+                state_variables[name] = self.StateVariable(name, data_type, allowed_value_list)
 
-                state_variables[state_variable_name] = self.StateVariable(
-                    state_variable_name,
-                    state_variable_data_type,
-                    state_variable_allowed_value_list
+            for name, arguments in parsed_actions:
+                all_actions[name] = self.Action(
+                    name,
+                    [self.Action.Argument(*argument) for argument in arguments],
+                    self
                 )
 
+            self.actions = all_actions
             self.state_variables = state_variables
-            return self.state_variables
-
-        @staticmethod
-        def _get_service_type(service):
 
-            """
-            Parse the service type <serviceType> portion of the service.
-            """
-
-            return service.split(':')[3]
+            # Expose the actions as instance attributes so they are looked up without going through __getattr__
+            for action_name, action in all_actions.items():
+                if not hasattr(type(self), action_name):
+                    self.__dict__.setdefault(action_name, action)
 
-        @staticmethod
-        def _get_service_version(service):
-
-            """
-            Parse the service version <v> portion of the service.
-            """
-
-            return int(service.split(':')[4])
+            return all_actions
 
         def __getattr__(self, action_name):
 
             """
-                **Allow executing an action through an attribute**
+                **Handle access to an unavailable action through an attribute**
 
-                Allows executing the specified action on the service through an attribute.
+                Available actions are set as attributes of the service when its description is parsed, so this is
+                only reached for actions the service does not provide.
 
                 :param action_name: Name of the action to execute on the service
-                :return: Response from the device's service after executing the specified action
-                :rtype: dict
+                :raises upnpy.exceptions.ActionNotFoundError: The action is not available for this service
             """
 
             if self.description == exceptions.NotAvailableError:
                 raise exceptions.NotAvailableError('Can\'t execute actions because a description for this service is'
                                                    ' not available.')
 
-            try:
-                return self.actions[action_name]
-            except KeyError:
-                raise exceptions.ActionNotFoundError(
-                    f'The "{action_name}" action is not available for this service.',
-                    action_name
-                )
+            raise exceptions.ActionNotFoundError(
+                f'The "{action_name}" action is not available for this service.',
+                action_name
+            )
 
         def __repr__(self):
             return f'<Service ({self.type_}) id="{utils.parse_service_id(self.id)}">'
@@ -475,6 +437,8 @@ class SSDPDevice:
                 :type service: SSDPDevice.Service
             """
 
+            __slots__ = ('name', 'arguments', 'args_in', 'args_out', 'args_in_names', 'envelope_template', 'service')
+
             def __init__(self, name, argument_list, service):
                 self.name = name
                 self.arguments = argument_list
@@ -494,6 +458,9 @@ class SSDPDevice:
                             argument.name
                         )
 
+                self.args_in_names = tuple(argument.name for argument in self.args_in)
+                self.envelope_template = SOAP.make_envelope_template(self.name, self.args_in_names)
+
             def get_input_arguments(self):
 
                 """
@@ -578,6 +545,8 @@ class SSDPDevice:
                     :param related_state_variable: Defines the type of the argument
                 """
 
+                __slots__ = ('name', 'direction', 'return_value', 'related_state_variable')
+
                 def __init__(self, name, direction, return_value, related_state_variable):
                     self.name = name
                     self.direction = direction
@@ -585,6 +554,8 @@ class SSDPDevice:
                     self.related_state_variable = related_state_variable
 
         class StateVariable:
+            __slots__ = ('name', 'data_type', 'allowed_value_list')
+
             def __init__(self, name, data_type, allowed_value_list=None):
                 self.name = name
                 self.data_type = data_type
@@ -0,0 +1,128 @@
+import upnpy.utils as utils
+
+
+def _xml_namespace(element):
+
+    """
+    Get the ``{namespace}`` prefix of an XML element's tag (empty string if the element has no namespace).
+    """
+
+    tag = element.tag
+    if tag.startswith('{'):
+        return tag[:tag.index('}') + 1]
+    return ''
+
+
+def _child_texts(element):
+
+    """
+    Get the text of an XML element's children by tag (without ``{namespace}`` prefix) in a single pass.
+    """
+
+    # lxml also yields comments and processing instructions, which have no local name
+    texts = {utils.xml_local_name(child): child.text or '' for child in element}
+    texts.pop(None, None)
+    return texts
+
+
+def parse_device(description):
+
+    """
+        **Parse a device description**
+
+        Parses the details of a device and the services of the device and of its embedded devices.
+
+        :param description: Device description
+        :type description: bytes
+        :return: Dictionary with the ``device_type``, ``friendly_name`` and ``url_base`` (None if not set) of the
+            device and its ``services``, a list of dictionaries with the ``service``, ``service_id``, ``scpd_url``,
+            ``control_url`` and ``event_sub_url`` of each service
+        :rtype: dict
+    """
+
+    root = utils.parse_xml_string(description)
+    ns = _xml_namespace(root)
+    services = []
+
+    for service in root.iter(f'{ns}service'):
+        service_values = _child_texts(service)
+        services.append({
+            'service': service_values.get('serviceType'),
+            'service_id': service_values.get('serviceId'),
+            'scpd_url': service_values.get('SCPDURL'),
+            'control_url': service_values.get('controlURL'),
+            'event_sub_url': service_values.get('eventSubURL')
+        })
+
+    return {
+        'device_type': root.findtext(f'.//{ns}deviceType'),
+        'friendly_name': root.findtext(f'.//{ns}friendlyName'),
+        'url_base': root.findtext(f'{ns}URLBase'),
+        'services': services
+    }
+
+
+def _parse_action(action, ns):
+
+    """
+    Parse an <action> element into a ``(name, arguments)`` tuple.
+    """
+
+    action_arguments = []
+
+    # An action's argument list is only required if the action has parameters according to UPnP spec
+    action_argument_list = action.find(f'{ns}argumentList')
+
+    if action_argument_list is not None:
+        for argument in action_argument_list.iterfind(f'{ns}argument'):
+            argument_values = _child_texts(argument)
+
+            # Argument return value is optional according to UPnP spec
+            action_arguments.append((
+                argument_values.get('name'),
+                argument_values.get('direction'),
+                argument_values.get('retval'),
+                argument_values.get('relatedStateVariable')
+            ))
+
+    return action.findtext(f'{ns}name'), action_arguments
+
+
+def _parse_state_variable(state_variable, ns):
+
+    """
+    Parse a <stateVariable> element into a ``(name, data_type, allowed_values)`` tuple.
+    """
+
+    state_variable_values = _child_texts(state_variable)
+    allowed_values = [
+        allowed_value.text for allowed_value in state_variable.iterfind(f'{ns}allowedValueList/{ns}allowedValue')
+    ]
+
+    return state_variable_values.get('name'), state_variable_values.get('dataType'), allowed_values
+
+
+def parse_scpd(description):
+
+    """
+        **Parse a service description**
+
+        Parses the actions and state variables of a service.
+
+        :param description: Service description
+        :type description: bytes
+        :return: List of ``(name, arguments)`` tuples for the actions, each argument being a
+            ``(name, direction, return_value, related_state_variable)`` tuple, and list of
+            ``(name, data_type, allowed_values)`` tuples for the state variables
+        :rtype: tuple
+    """
+
+    root = utils.parse_xml_string(description)
+    ns = _xml_namespace(root)
+
+    actions = [_parse_action(action, ns) for action in root.iter(f'{ns}action')]
+    state_variables = [
+        _parse_state_variable(state_variable, ns) for state_variable in root.iter(f'{ns}stateVariable')
+    ]
+
+    return actions, state_variables
@@ -1,4 +1,7 @@
 import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import upnpy.utils as utils
 from upnpy.ssdp.SSDPHeader import SSDPHeader
 from upnpy.ssdp.SSDPDevice import SSDPDevice
 
@@ -95,7 +98,7 @@ class SSDPRequest(SSDPHeader):
     def _send_request(self, message):
         self.socket.sendto(message.encode(), (self.SSDP_MCAST_ADDR, self.SSDP_PORT))
 
-        devices = []
+        responses = []
 
         try:
             while True:
@@ -104,9 +107,15 @@ class SSDPRequest(SSDPHeader):
                 # https://en.wikipedia.org/wiki/User_Datagram_Protocol#Packet_structure
 
                 response, addr = self.socket.recvfrom(65507)
-                device = SSDPDevice(addr, response.decode())
-                devices.append(device)
+                responses.append((addr, response.decode()))
         except socket.timeout:
             pass
 
+        # Devices retrieve their descriptions when created, set them up concurrently once discovery is over
+        if len(responses) > 1:
+            with ThreadPoolExecutor(max_workers=utils.MAX_CONCURRENT_REQUESTS) as executor:
+                devices = list(executor.map(lambda reply: SSDPDevice(*reply), responses))
+        else:
+            devices = [SSDPDevice(*reply) for reply in responses]
+
         return devices
@@ -1,9 +1,21 @@
 import argparse
+import ipaddress
+import json
+import os
+import re
 import socket
+import struct
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from itertools import count
+from urllib.parse import urlparse
 import upnpy
 
+# ioctl requests for the IPv4 address and netmask of an interface (Linux)
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891B
+
 
 class Igd:
     def __init__(
@@ -11,13 +23,28 @@ class Igd:
         ssdp_st="urn:schemas-upnp-org:device:InternetGatewayDevice:2",
         ssdp_delay=4,
         upnp_service="WANIPConnection",
+        use_cache=True,
     ):
-        self.local_ip = self._get_local_ip()
-        self.service = self._get_upnp_service(
-            ssdp_st, ssdp_delay, upnp_service, bind_ip=self.local_ip
-        )
+        # Multicast from the interface routed to the SSDP multicast group if there is one
+        bind_ip = self._get_local_ip()
+        cache_path = self._get_cache_path(self._get_local_network(bind_ip))
+        cache_key = {"ssdp_st": ssdp_st, "upnp_service": upnp_service}
+
+        self.service = None
+        if use_cache:
+            self.service = self._load_cached_service(
+                cache_path, cache_key, timeout=ssdp_delay
+            )
         if not self.service:
-            raise IgdError("No gateway service found")
+            device, self.service = self._get_upnp_service(
+                ssdp_st, ssdp_delay, upnp_service, bind_ip=bind_ip
+            )
+            if not self.service:
+                raise IgdError("No gateway service found")
+            if use_cache:
+                self._save_cached_service(cache_path, cache_key, device, self.service)
+        # Mappings forward to the address this host uses to reach the gateway
+        self.local_ip = self._get_local_ip(urlparse(self.service.base_url).hostname)
 
     @staticmethod
     def _get_upnp_service(ssdp_st, ssdp_delay, upnp_service, bind_ip=None):
@@ -26,21 +53,118 @@ class Igd:
         for device in ssdp.m_search(discover_delay=ssdp_delay, st=ssdp_st):
             for service in device.get_services():
                 if service.service.startswith(service_urn):
+                    return device, service
+        return None, None
+
+    @staticmethod
+    def _get_cache_path(local_network):
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        name = str(local_network).replace("/", "-") if local_network else "default"
+        return os.path.join(cache_home, "upnpy", "igd-{}.json".format(name))
+
+    @staticmethod
+    def _load_cached_service(cache_path, cache_key, timeout):
+        try:
+            with open(cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            if cache["key"] == cache_key and cache["expires"] > time.time():
+                # Only the SCPD is fetched again, which also checks the gateway is still there.
+                # Don't wait longer than a discovery would if it's unreachable from here.
+                service = upnpy.ssdp.SSDPDevice.SSDPDevice.Service(
+                    **cache["service"], timeout=timeout
+                )
+                if service.description != upnpy.exceptions.NotAvailableError:
                     return service
+        except Exception:
+            pass
+
+        # Stale or unusable, discover the gateway again
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
         return None
 
     @staticmethod
-    def _get_local_ip():
+    def _save_cached_service(cache_path, cache_key, device, service):
+        # Keep the gateway for as long as its advertisement is valid
+        max_age = re.search(
+            r"max-age\s*=\s*(\d+)", device.headers.get("cache-control", "")
+        )
+        if not max_age:
+            return
+
+        cache = {
+            "key": cache_key,
+            "expires": time.time() + int(max_age.group(1)),
+            "service": {
+                "service": service.service,
+                "service_id": service.id,
+                "scpd_url": service.scpd_url,
+                "control_url": service.control_url,
+                "event_sub_url": service.event_sub_url,
+                "base_url": service.base_url,
+                "config_id": service.config_id,
+                "udn": service.udn,
+            },
+        }
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, "w") as f:
+                json.dump(cache, f)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _get_local_ip(remote_host="239.255.255.250"):
+        # Connecting a UDP socket only selects the route, no packet is sent
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.settimeout(0)
         try:
-            sock.connect(("8.8.8.8", 80))
+            sock.connect((remote_host, 80))
             return sock.getsockname()[0]
         except:
             return None
         finally:
             sock.close()
 
+    @staticmethod
+    def _get_local_network(local_ip):
+        if not local_ip:
+            return None
+
+        # Ask the kernel for the netmask of the interface with this address (Linux)
+        netmask = None
+        try:
+            import fcntl
+
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                for _, name in socket.if_nameindex():
+                    ifreq = struct.pack("256s", name.encode()[:15])
+                    try:
+                        address = fcntl.ioctl(sock, SIOCGIFADDR, ifreq)[20:24]
+                        if socket.inet_ntoa(address) == local_ip:
+                            netmask = fcntl.ioctl(sock, SIOCGIFNETMASK, ifreq)[20:24]
+                            break
+                    except OSError:
+                        # No IPv4 address on this interface
+                        pass
+            finally:
+                sock.close()
+        except (ImportError, AttributeError, OSError):
+            pass
+
+        if netmask is None:
+            return ipaddress.ip_network(local_ip)
+        return ipaddress.ip_interface(
+            "{}/{}".format(local_ip, socket.inet_ntoa(netmask))
+        ).network
+
     def AddPortMapping(self, port, protocol, description):
         try:
             self.service.AddPortMapping(
@@ -71,18 +195,49 @@ class Igd:
             )
 
     def GetPortMappings(self):
-        mappings = []
-        for i in count():
-            try:
-                mappings.append(
-                    self.service.GetGenericPortMappingEntry(NewPortMappingIndex=i)
-                )
-            except:
-                break
-        return mappings
+        return list(self._iter_port_mappings())
+
+    def _iter_port_mappings(self, batch_size=upnpy.utils.MAX_CONCURRENT_REQUESTS):
+        # Without the action (or the service description) the table is empty
+        try:
+            get_entry = self.service.GetGenericPortMappingEntry
+        except (
+            upnpy.exceptions.ActionNotFoundError,
+            upnpy.exceptions.NotAvailableError,
+        ):
+            return
+
+        # Entries are probed in parallel batches, the table ends at the first index that fails
+        with ThreadPoolExecutor(max_workers=batch_size) as executor:
+            for start in count(0, batch_size):
+                futures = [
+                    executor.submit(get_entry, NewPortMappingIndex=i)
+                    for i in range(start, start + batch_size)
+                ]
+                for future in futures:
+                    try:
+                        mapping = future.result()
+                    except Exception:
+                        return
+                    yield mapping
 
     def HasPortMapping(self, port, protocol):
-        for mapping in self.GetPortMappings():
+        # Look the mapping up directly, scan the table only if the gateway can't
+        try:
+            self.service.GetSpecificPortMappingEntry(
+                NewRemoteHost="", NewExternalPort=port, NewProtocol=protocol
+            )
+            return True
+        except upnpy.exceptions.SOAPError as e:
+            if e.error == 714:  # NoSuchEntryInArray
+                return False
+        except (
+            upnpy.exceptions.ActionNotFoundError,
+            upnpy.exceptions.NotAvailableError,
+        ):
+            pass
+
+        for mapping in self._iter_port_mappings():
             if (
                 mapping["NewExternalPort"] == str(port)
                 and mapping["NewProtocol"] == protocol
@@ -96,8 +251,18 @@ class IgdError(Exception):
         self.message = message
 
 
+_IGD_SINGLETON = None
+
+
+def get_igd():
+    global _IGD_SINGLETON
+    if _IGD_SINGLETON is None:
+        _IGD_SINGLETON = Igd()
+    return _IGD_SINGLETON
+
+
 def _discover(_):
-    igd = Igd()
+    igd = get_igd()
     print("Gateway service found, description: {}".format(igd.service.scpd_url))
 
 
@@ -106,7 +271,7 @@ def _add(args):
     protocol = args.protocol.upper()
     description = " ".join(args.description)
 
-    igd = Igd()
+    igd = get_igd()
     if not igd.HasPortMapping(port, protocol):
         igd.AddPortMapping(port, protocol, description)
         print("Mapping for {} port {} added".format(protocol, port))
@@ -116,13 +281,13 @@ def _delete(args):
     port = args.port
     protocol = args.protocol.upper()
 
-    igd = Igd()
+    igd = get_igd()
     igd.DeletePortMapping(port, protocol)
     print("Mapping for {} port {} deleted".format(protocol, port))
 
 
 def _list(_):
-    igd = Igd()
+    igd = get_igd()
     for mapping in igd.GetPortMappings():
         print(
             "{:>5}  {}  {:15} {:5}  {:37}  {:>5}s".format(
@@ -1,5 +1,39 @@
+import functools
+import http.client
+import io
+import re
+import socket
+import threading
+import urllib.error
+import urllib.parse
 import urllib.request
 
+# lxml's C parser is used when it is installed (pip install upnpy[fast])
+try:
+    from lxml import etree as ET
+
+    # Never resolve entities from documents sent by devices on the network
+    _XML_PARSER_OPTIONS = {'resolve_entities': False}
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+    _XML_PARSER_OPTIONS = {}
+
+
+# Maximum number of HTTP requests made concurrently to devices
+MAX_CONCURRENT_REQUESTS = 8
+
+# Shared by all threads, so nested thread pools don't multiply the number of requests in flight
+_http_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# A "name: value" header line, header names being any visible ASCII characters except ":". Whitespace around
+# the name is tolerated, as some devices send indented lines or "Name : value".
+_HTTP_HEADER_PATTERN = re.compile(r'^[ \t]*([!-9;-~]+)[ \t]*:[ \t]*(.*?)[ \t]*\r?$', re.MULTILINE)
+
+# Idle persistent HTTP connections by netloc
+_http_connections = {}
+_http_connections_lock = threading.Lock()
+
 
 def parse_device_type(device_type):
 
@@ -37,26 +71,46 @@ def parse_http_header(header, header_key):
     """
         **Parse HTTP header value**
 
-        Parse the value of a specific header from a RAW HTTP response.
+        Parse the value of a specific header from a RAW HTTP response. Header lines are matched the same way as
+        by ``parse_http_headers``.
 
         :param header: String containing the RAW HTTP response and headers
         :type header: str
         :param header_key: The header name of which to extract a value from
         :type header_key: str
-        :return: The value of the header
+        :return: The first word of the value of the header
         :rtype: str
     """
 
-    split_headers = header.split('\r\n')
+    value = parse_http_headers(header).get(header_key.strip().lower())
+
+    if value:
+        return value.split(maxsplit=1)[0]
+    return value
+
+
+def parse_http_headers(response):
+
+    """
+        **Parse all HTTP header values**
+
+        Parse the headers of a RAW HTTP response into a dictionary in a single pass.
+
+        :param response: String containing the RAW HTTP response and headers
+        :type response: str
+        :return: Header values by lowercase header name
+        :rtype: dict
+    """
+
+    headers = {}
 
-    for entry in split_headers:
-        header = entry.strip().split(':', 1)
+    for name, value in _HTTP_HEADER_PATTERN.findall(response):
+        headers.setdefault(name.lower(), value)
 
-        if header[0].strip().lower() == header_key.strip().lower():
-            return ''.join(header[1::]).split()[0]
+    return headers
 
 
-def make_http_request(url, data=None, headers=None):
+def make_http_request(url, data=None, headers=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
 
     """
         **Helper function for making HTTP requests**
@@ -69,6 +123,8 @@ def make_http_request(url, data=None, headers=None):
         :type data: str
         :param headers: Provide headers to send with the request
         :type headers: dict
+        :param timeout: Timeout in seconds for blocking operations (the global default timeout if not set)
+        :type timeout: float
         :return: A urllib.Request.urlopen object
         :rtype: urllib.Request.urlopen
     """
@@ -78,4 +134,172 @@ def make_http_request(url, data=None, headers=None):
 
     # If data is provided the request method will automatically be set to POST by urllib
     request = urllib.request.Request(url, data=data, headers=headers)
-    return urllib.request.urlopen(request)
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+def make_http_get_request(url, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
+
+    """
+        **Helper function for making HTTP GET requests over persistent connections**
+
+        Helper function for making HTTP GET requests using http.client. Connections are kept alive and reused
+        for subsequent requests to the same host, which avoids a TCP handshake per description retrieved
+        from a device. At most ``MAX_CONCURRENT_REQUESTS`` requests are made at a time across all threads.
+        Errors are raised the same way as ``make_http_request`` does.
+
+        :param url: The URL to which a request should be made
+        :type url: str
+        :param timeout: Timeout in seconds for blocking operations (the global default timeout if not set)
+        :type timeout: float
+        :return: The response body
+        :rtype: bytes
+    """
+
+    if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+        timeout = socket.getdefaulttimeout()
+
+    with _http_request_slots:
+        return _make_http_get_request(url, timeout)
+
+
+def _make_http_get_request(url, timeout):
+    parsed_url = urllib.parse.urlparse(url)
+
+    if parsed_url.scheme != 'http':
+        return make_http_request(url, timeout=timeout).read()
+
+    netloc = parsed_url.netloc
+    path = parsed_url.path or '/'
+    if parsed_url.query:
+        path += '?' + parsed_url.query
+
+    while True:
+        with _http_connections_lock:
+            idle_connections = _http_connections.get(netloc)
+            connection = idle_connections.pop() if idle_connections else None
+
+        reused = connection is not None
+        if not reused:
+            connection = http.client.HTTPConnection(netloc, timeout=timeout)
+        else:
+            # Idle connections may have been opened with another timeout
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            body = response.read()
+            break
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+
+            # The device may have closed an idle connection, retry on a new one
+            if not reused:
+                raise urllib.error.URLError(e)
+
+    if response.will_close:
+        connection.close()
+    else:
+        with _http_connections_lock:
+            _http_connections.setdefault(netloc, []).append(connection)
+
+    # Let urllib follow redirects
+    if 300 <= response.status < 400:
+        return make_http_request(url, timeout=timeout).read()
+    if response.status >= 400:
+        raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+
+    return body
+
+
+def close_http_connections(*urls):
+
+    """
+        **Close idle persistent HTTP connections**
+
+        Closes the idle connections kept alive by ``make_http_get_request`` for the hosts of the given URLs.
+
+        :param urls: URLs of the hosts for which connections should be closed
+        :type urls: str
+    """
+
+    for url in urls:
+        if not url:
+            continue
+
+        with _http_connections_lock:
+            idle_connections = _http_connections.pop(urllib.parse.urlparse(url).netloc, [])
+
+        for connection in idle_connections:
+            connection.close()
+
+
+@functools.lru_cache(maxsize=64)
+def _fetch_cached_xml(url, config_id, udn, timeout):
+    return make_http_get_request(url, timeout)
+
+
+def fetch_xml(url, config_id=None, udn=None, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
+
+    """
+        **Fetch an XML document**
+
+        Fetches a device or service description, reading the whole response body. Documents are only cached for
+        devices announcing both their UDN (in the ``USN`` header) and a ``CONFIGID.UPNP.ORG`` value, which changes
+        whenever the device's descriptions change. They are cached by URL, UDN and configuration ID, so another
+        device answering on the same URL doesn't get a stale description. Use ``fetch_xml.cache_clear()`` to drop
+        all cached documents.
+
+        :param url: The URL of the XML document
+        :type url: str
+        :param config_id: Configuration ID announced by the device, if any
+        :type config_id: str
+        :param udn: Unique Device Name of the device (``uuid:...``), if known
+        :type udn: str
+        :param timeout: Timeout in seconds for blocking operations (the global default timeout if not set)
+        :type timeout: float
+        :return: The raw XML document
+        :rtype: bytes
+    """
+
+    if config_id is None or udn is None:
+        return make_http_get_request(url, timeout)
+    return _fetch_cached_xml(url, config_id, udn, timeout)
+
+
+fetch_xml.cache_clear = _fetch_cached_xml.cache_clear
+
+
+def xml_local_name(element):
+
+    """
+        **Get the local name of an XML element**
+
+        Gets the tag of an XML element without its ``{namespace}`` prefix.
+
+        :param element: The XML element
+        :return: The tag without namespace, None for comments and processing instructions (lxml)
+        :rtype: str
+    """
+
+    if isinstance(element.tag, str):
+        return element.tag.rpartition('}')[2]
+    return None
+
+
+def parse_xml_string(text):
+
+    """
+        **Parse an XML document**
+
+        Parses an XML document using lxml if available or the standard library ElementTree otherwise.
+
+        :param text: The XML document
+        :type text: bytes
+        :return: Root element of the document
+        :rtype: xml.etree.ElementTree.Element
+    """
+
+    return ET.fromstring(text, ET.XMLParser(**_XML_PARSER_OPTIONS))